@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+Ahead-of-time compile the snapshot decoding kernel with Numba.
+
+Run this script once, e.g., after installation, to create the extension
+module snapshot_decode next to dataset.py. If present, dataset.py imports it
+and does not need to compile its decoding kernel just-in-time.
+
+    python build_decode.py
+
+"""
+import os
+from numba.pycc import CC
+from dataset import _expand_bits
+
+cc = CC("snapshot_decode")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+cc.export("decode", "void(u1[::1], i1[::1])")(_expand_bits)
+
+
+if __name__ == "__main__":
+    cc.compile()
@@ -5,9 +5,253 @@ Created on Wed Apr 21 15:11:44 2021
 @author: Jonas Beuchert
 """
 import os
-import glob
+import re
+import math
 import json
+import tempfile
+import zipfile
 import numpy as np
+try:
+    from numba import njit, prange, types
+except ImportError:
+    njit = None
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+try:
+    from lxml import etree as _etree
+except ImportError:
+    _etree = None
+
+# Permission mask of process to create cache files with default permissions
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _iter_xml_elements(xml_file, *names):
+    """
+    Stream XML elements with given local tag names from file.
+
+    Uses lxml if available and the standard library otherwise. Elements are
+    cleared after they were yielded to limit memory usage.
+
+    Parameters
+    ----------
+    xml_file : string
+        Path to XML file, e.g., .gpx or .kml file.
+    *names : string
+        Tag names of elements without namespace.
+
+    Yields
+    ------
+    Element
+        Matching element after its end tag was parsed.
+
+    """
+    if _etree is not None:
+        elements = (elem for _, elem in _etree.iterparse(
+            xml_file, tag=["{*}" + name for name in names]))
+    else:
+        import xml.etree.ElementTree as et
+        elements = (elem for _, elem in et.iterparse(xml_file)
+                    if elem.tag.rpartition("}")[2] in names)
+    for elem in elements:
+        yield elem
+        elem.clear()
+
+
+def _save_atomically(filename, mtime_ns, save_function, *args, **kwargs):
+    """
+    Write file via temporary file such that it is never seen incomplete.
+
+    Parameters
+    ----------
+    filename : string
+        Path of file to write.
+    mtime_ns : int
+        Modification time [ns] to set for file, e.g., that of the source file
+        of a cache, which allows to detect outdated caches.
+    save_function : callable
+        Function that writes to a file object passed as first argument,
+        e.g., numpy.save or numpy.savez.
+    *args, **kwargs
+        Further arguments for save_function.
+
+    Returns
+    -------
+    None.
+
+    """
+    file_descriptor, temp_filename = tempfile.mkstemp(
+        dir=os.path.dirname(filename), suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as file_id:
+            save_function(file_id, *args, **kwargs)
+        # Temporary files are only accessible by owner, use default instead
+        os.chmod(temp_filename, 0o666 & ~_UMASK)
+        os.utime(temp_filename, ns=(mtime_ns, mtime_ns))
+        os.replace(temp_filename, filename)
+    except BaseException:
+        os.remove(temp_filename)
+        raise
+
+
+# WGS84 ellipsoid semi-major axis [m] and squared first eccentricity
+_WGS84_A = 6378137.0
+_WGS84_E2 = (2.0 - 1.0 / 298.257223563) / 298.257223563
+
+
+def _geodetic2ecef(latitude, longitude):
+    """
+    Transform geodetic coordinates on ellipsoid surface to ECEF coordinates.
+
+    Parameters
+    ----------
+    latitude : float or numpy.ndarray, shape=(N,)
+        Latitude(s) [°].
+    longitude : float or numpy.ndarray, shape=(N,)
+        Longitude(s) [°].
+
+    Returns
+    -------
+    numpy.ndarray, dtype=float64, shape=(3,) or shape=(3, N)
+        ECEF coordinates [m].
+
+    """
+    lat = np.radians(latitude)
+    lon = np.radians(longitude)
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    # Prime vertical radius of curvature
+    n = _WGS84_A / np.sqrt(1.0 - _WGS84_E2 * sin_lat**2)
+    return np.array([n * cos_lat * np.cos(lon),
+                     n * cos_lat * np.sin(lon),
+                     n * (1.0 - _WGS84_E2) * sin_lat])
+
+
+def _ecef2enu_rotation(latitude, longitude):
+    """
+    Get rotation matrix from ECEF to local ENU coordinates.
+
+    Parameters
+    ----------
+    latitude : float
+        Latitude of reference location [°].
+    longitude : float
+        Longitude of reference location [°].
+
+    Returns
+    -------
+    numpy.ndarray, dtype=float64, shape=(3, 3)
+        Rotation matrix.
+
+    """
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    sin_lat, cos_lat = math.sin(lat), math.cos(lat)
+    sin_lon, cos_lon = math.sin(lon), math.cos(lon)
+    return np.array([[-sin_lon, cos_lon, 0.0],
+                     [-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat],
+                     [cos_lat * cos_lon, cos_lat * sin_lon, sin_lat]])
+
+
+def _expand_bits(bytes_in, out):
+    """
+    Decode raw bytes into signal samples.
+
+    Shared by the just-in-time kernels below and the ahead-of-time kernel in
+    build_decode.py.
+
+    Parameters
+    ----------
+    bytes_in : numpy.ndarray, dtype=uint8, shape=(N,)
+        Binary raw data, eight samples per byte, 'little' bit order.
+    out : numpy.ndarray, dtype=int8, shape=(8*N,)
+        Output buffer for samples in {-1, +1}.
+
+    Returns
+    -------
+    None.
+
+    """
+    for i in range(bytes_in.shape[0]):
+        byte = bytes_in[i]
+        for b in range(8):
+            out[i * 8 + b] = 1 - 2 * ((byte >> b) & 1)
+
+
+if njit is not None:
+    # Memory-mapped files are read-only
+    _READONLY_BYTES = types.Array(types.uint8, 1, 'C', readonly=True)
+    # Decode single snapshot serially, threads do not pay off for 6138 bytes
+    _decode = njit(["void(uint8[::1], int8[::1])",
+                    types.void(_READONLY_BYTES, types.int8[::1])],
+                   cache=True)(_expand_bits)
+
+    @njit(["void(uint8[::1], float32[::1])",
+           types.void(_READONLY_BYTES, types.float32[::1])], cache=True)
+    def _decode_normalized(bytes_in, out):
+        """
+        Decode raw bytes into signal samples with mean removed.
+
+        The mean is obtained from the set bits first, such that the output is
+        written in a single pass.
+
+        Parameters
+        ----------
+        bytes_in : numpy.ndarray, dtype=uint8, shape=(N,)
+            Binary raw data, eight samples per byte, 'little' bit order.
+        out : numpy.ndarray, dtype=float32, shape=(8*N,)
+            Output buffer for samples in {-1, +1} minus their mean.
+
+        Returns
+        -------
+        None.
+
+        """
+        ones = 0
+        for i in range(bytes_in.shape[0]):
+            byte = bytes_in[i]
+            for b in range(8):
+                ones += (byte >> b) & 1
+        mean = 1.0 - 2.0 * ones / out.shape[0]
+        for i in range(bytes_in.shape[0]):
+            byte = bytes_in[i]
+            for b in range(8):
+                out[i * 8 + b] = 1 - 2 * ((byte >> b) & 1) - mean
+
+    @njit("void(uint8[:, ::1], int8[:, ::1])",
+          parallel=True, nogil=True, cache=True)
+    def _decode_batch(bytes_in, out):
+        """
+        Decode raw bytes of multiple snapshots in parallel, one per thread.
+
+        Parameters
+        ----------
+        bytes_in : numpy.ndarray, dtype=uint8, shape=(K, N)
+            Binary raw data of K snapshots, eight samples per byte.
+        out : numpy.ndarray, dtype=int8, shape=(K, 8*N)
+            Output buffer for samples in {-1, +1}.
+
+        Returns
+        -------
+        None.
+
+        """
+        for k in prange(bytes_in.shape[0]):
+            _decode(bytes_in[k], out[k])
+else:
+    _decode = None
+    _decode_normalized = None
+    _decode_batch = None
+
+try:
+    # Ahead-of-time compiled kernel, see build_decode.py
+    from snapshot_decode import decode as _decode
+except ImportError:
+    pass
 
 
 class Dataset:
@@ -20,8 +264,12 @@ class Dataset:
         Get number of snapshots in dataset, i.e., size of dataset.
     get_snapshot(idx, normalize=False)
         Get specific raw GNSS signal snapshot.
+    get_snapshots(indices, normalize=False)
+        Get multiple raw GNSS signal snapshots at once.
     get_ground_truth()
         Get ground truth location or track.
+    get_ground_truth_arrays()
+        Get ground truth location or track as arrays.
     get_intermediate_frequency()
         Get intermediate frequency.
     get_timestamps()
@@ -35,7 +283,15 @@ class Dataset:
 
     """
 
-    def __init__(self, directory):
+    # Snapshot of 12 ms sampled at 4.092 MHz with one bit per sample, i.e.,
+    # 49104 samples in 6138 bytes, evaluated once when class is created
+    _SAMPLES_PER_SNAPSHOT = 4092000 * 12 // 1000
+    _BYTES_PER_SNAPSHOT = _SAMPLES_PER_SNAPSHOT // 8
+    # Fields of meta.json that are cached in meta.npz
+    _META_KEYS = ("intermediate_frequency", "file", "timestamp", "temperature",
+                  "pressure", "latitude", "longitude")
+
+    def __init__(self, directory, cache=True, cache_directory=None):
         """
         Create snapshot dataset representation.
 
@@ -45,6 +301,15 @@ class Dataset:
             Dataset directory that contains the binary raw data as .bin files,
             other data as meta.json file, and potentially ground truth tracks
             as .kml or .gpx file(s).
+        cache : bool, optional
+            Cache parsed meta data as meta.npz file and decoded snapshots as
+            .npy files, which are about eight times larger than the .bin
+            files, to speed up later access. Caching is skipped silently if
+            the cache directory is not writable. The default is True.
+        cache_directory : string, optional
+            Directory for the cache files of this dataset. Must not be shared
+            with other datasets. The default is None, i.e., the dataset
+            directory.
 
         Returns
         -------
@@ -52,14 +317,62 @@ class Dataset:
 
         """
         self._directory = directory
-        # Load meta data from json file
+        self._cache = cache
+        self._cache_directory = (directory if cache_directory is None
+                                 else cache_directory)
+        if cache and cache_directory is not None:
+            try:
+                os.makedirs(cache_directory, exist_ok=True)
+            except OSError:
+                pass
+        # Caches are only written to writable directory and skipped after
+        # writing failed once
+        self._cache_writable = cache and os.access(self._cache_directory,
+                                                   os.W_OK)
         meta_file = os.path.join(directory, "meta.json")
+        meta_cache = os.path.join(self._cache_directory, "meta.npz")
         try:
-            with open(meta_file, "r") as file_id:
-                meta_data = json.load(file_id)
-        except (ValueError, IOError):
-            print(f"Cannot read data from {meta_file}.")
-            return
+            meta_mtime_ns = os.stat(meta_file).st_mtime_ns
+        except OSError:
+            meta_mtime_ns = None
+        # Load meta data from cache if it was created from current json file
+        meta_data = None
+        try:
+            if (cache and meta_mtime_ns is not None
+                    and os.stat(meta_cache).st_mtime_ns == meta_mtime_ns):
+                with np.load(meta_cache, allow_pickle=False) as npz_file:
+                    # Strip prefix that avoids clash with np.savez arguments
+                    meta_data = {key[len("meta_"):]: npz_file[key]
+                                 for key in npz_file.files
+                                 if key.startswith("meta_")}
+                # Restore scalars and list of filenames
+                meta_data = {key: value.item() if value.ndim == 0 else value
+                             for key, value in meta_data.items()}
+                if "file" in meta_data:
+                    meta_data["file"] = meta_data["file"].tolist()
+        except (ValueError, OSError, EOFError, zipfile.BadZipFile):
+            # Cache is missing, outdated, or broken
+            meta_data = None
+        if meta_data is None:
+            # Load meta data from json file
+            try:
+                with open(meta_file, "rb") as file_id:
+                    meta_data = _json_loads(file_id.read())
+            except (ValueError, IOError):
+                print(f"Cannot read data from {meta_file}.")
+                return
+            # Store meta data as arrays for next time
+            meta_arrays = {"meta_" + key: np.asarray(meta_data[key])
+                           for key in self._META_KEYS if key in meta_data}
+            if (self._cache_writable and meta_mtime_ns is not None
+                    and all(value.dtype != object
+                            for value in meta_arrays.values())):
+                try:
+                    _save_atomically(meta_cache, meta_mtime_ns, np.savez,
+                                     **meta_arrays)
+                except (ValueError, OSError):
+                    print(f"Cannot write meta data to {meta_cache}.")
+                    self._cache_writable = False
         # Set class instance attributes
         try:
             self._intermediate_frequency = meta_data["intermediate_frequency"]
@@ -72,12 +385,12 @@ class Dataset:
             self._filenames = None
             print(f"No filenames in {meta_file}.")
         try:
-            self._timestamps = np.array([np.datetime64(d)
-                                         for d in meta_data["timestamp"]])
+            self._timestamps = np.asarray(meta_data["timestamp"],
+                                          dtype='datetime64[ms]')
         except KeyError:
             self._timestamps = None
             print(f"No timestamps in {meta_file}.")
-        except ValueError():
+        except ValueError:
             self._timestamps = None
             print(f"Timestamps do not match expected format in {meta_file}.")
         try:
@@ -92,59 +405,71 @@ class Dataset:
             print(f"No pressures in {meta_file}.")
 
         # Ground truth track for dynamic dataset
-        gt_files = sorted(glob.glob(os.path.join(directory, "ground_truth*")))
+        with os.scandir(directory) as entries:
+            gt_files = sorted(entry.path for entry in entries
+                              if entry.name.startswith("ground_truth")
+                              and entry.is_file())
         if len(gt_files) > 0:
-            try:
-                import pymap3d as pm
-                import xml.etree.ElementTree as et
-                import shapely.geometry as sg
-            except ImportError:
-                print("Miss packages that are required to load ground truth.")
-                print("Install pymap3d and Shapely.")
-                return
             gt_enu = []
             for gt_file in gt_files:
-                # Load ground truth
-                root = et.parse(gt_file).getroot()
                 file_ending = gt_file[-3:]
                 print("Open ground truth file of type " + file_ending + ".")
                 if file_ending == "gpx":
-                    # Ground truth track as list of polyline nodes
-                    self._ground_truth = [{
-                        "latitude": float(child.attrib['lat']),
-                        "longitude": float(child.attrib['lon'])
-                        } for child in root[-1][-1]]
+                    # Stream track points of last track segment from file
+                    lat_list = []
+                    lon_list = []
+                    segment = ([], [])
+                    for elem in _iter_xml_elements(gt_file, "trkpt",
+                                                   "trkseg"):
+                        if elem.tag.endswith("trkseg"):
+                            lat_list, lon_list = segment
+                            segment = ([], [])
+                        else:
+                            segment[0].append(float(elem.attrib['lat']))
+                            segment[1].append(float(elem.attrib['lon']))
+                    # Ground truth track as arrays of polyline nodes
+                    lat_arr = np.array(lat_list, dtype=np.float64)
+                    lon_arr = np.array(lon_list, dtype=np.float64)
                 elif file_ending == "kml":
-                    # Get coordinates of path
-                    try:
-                        gt_string = root[-1][-1][-1][-1][-1][-1].text
-                    except(IndexError):
-                        gt_string = root[-1][-1][-1][-1].text
-                    gt_geo = np.fromstring(
-                        gt_string.replace('\n', '').replace('\t', '').replace(
-                            ' ', ','), sep=',')
-                    # Ground truth track as list of polyline nodes
-                    self._ground_truth = [{"latitude": lat,
-                                           "longitude": lon}
-                                          for lat, lon
-                                          in zip(gt_geo[1::3], gt_geo[::3])]
+                    # Get coordinates of path, which is the last one in file
+                    gt_string = None
+                    for elem in _iter_xml_elements(gt_file, "coordinates"):
+                        gt_string = elem.text
+                    if not gt_string:
+                        raise ValueError(
+                            f"No coordinates in ground truth file {gt_file}.")
+                    # Separate all values by single commas in one pass
+                    gt_string = re.sub(r'[\s,]+', ',', gt_string).strip(',')
+                    gt_geo = np.array(gt_string.split(','), dtype=np.float64)
+                    # Ground truth track as arrays of polyline nodes
+                    lat_arr = np.ascontiguousarray(gt_geo[1::3])
+                    lon_arr = np.ascontiguousarray(gt_geo[::3])
                 else:
                     raise ValueError(
                         "Ground truth file format {} not recognized.".format(
                             file_ending))
 
+                self._ground_truth_latlon = (lat_arr, lon_arr)
+
                 # Transform to ENU coordinates with same reference
-                self._ref_location = self._ground_truth[0]
-                gt_enu.append(np.array(pm.geodetic2enu(
-                    [g["latitude"] for g in self._ground_truth],
-                    [g["longitude"] for g in self._ground_truth], 0,
-                    self._ref_location["latitude"],
-                    self._ref_location["longitude"], 0)).T)
+                self._ref_location = {"latitude": float(lat_arr[0]),
+                                      "longitude": float(lon_arr[0])}
+                ref_ecef = _geodetic2ecef(lat_arr[0], lon_arr[0])
+                ecef2enu = _ecef2enu_rotation(lat_arr[0], lon_arr[0])
+                gt_enu.append((ecef2enu @ (_geodetic2ecef(lat_arr, lon_arr)
+                                           - ref_ecef[:, None])).T)
             # Concatenate both parts, if there are two
             gt_enu = np.vstack(gt_enu)
-            # Convert to line
-            self._track = sg.LineString([(p[0], p[1]) for p in gt_enu])
+            # Convert to line segments with start points and directions
+            self._seg_a = gt_enu[:-1, :2]
+            self._seg_b = gt_enu[1:, :2]
+            self._seg_d = self._seg_b - self._seg_a
+            self._seg_len2 = (self._seg_d**2).sum(1)
+            # Avoid division by zero for degenerate segments
+            self._seg_len2[self._seg_len2 == 0.0] = 1.0
+            self._ground_truth = None
         else:
+            self._ground_truth_latlon = None
             try:
                 self._ground_truth = {
                     "latitude": meta_data["latitude"],
@@ -154,7 +479,18 @@ class Dataset:
                 print(f"No ground truth file in {directory}.")
                 print(f"No ground truth location in {meta_file}.")
             self._ref_location = self._ground_truth
-            self._track = None
+            self._seg_a = None
+
+        # Precompute transformation to ENU coordinates w.r.t. reference
+        if self._ref_location is not None:
+            self._ref_ecef = _geodetic2ecef(self._ref_location["latitude"],
+                                            self._ref_location["longitude"])
+            self._ecef2enu = _ecef2enu_rotation(
+                self._ref_location["latitude"],
+                self._ref_location["longitude"])
+        else:
+            self._ref_ecef = None
+            self._ecef2enu = None
 
     def get_size(self):
         """
@@ -186,6 +522,10 @@ class Dataset:
             Binary raw GNSS snapshot with length 12 ms sampled at 4.092 MHz.
             Samples element of {-1, +1} if normalize=False.
             DC component removed, i.e., mean subtracted if normalize=True.
+            If caching is enabled, the decoded snapshot is stored as .npy file
+            and memory-mapped on subsequent calls. Hence, the returned array
+            is always read-only if normalize=False.
+            None if the file cannot be read or is shorter than 12 ms.
 
         """
         try:
@@ -194,23 +534,210 @@ class Dataset:
             print(
                 f"Snapshot index {idx} out of range {0}-{self.get_size()-1}.")
             return None
-        # Read signals from files
-        # How many bytes to read
-        bytes_per_snapshot = int(4092000.0 * 12e-3 / 8)
-        # Read binary raw data from file
-        signal_bytes = np.fromfile(filename, dtype='>u1',
-                                   count=bytes_per_snapshot)
-        # Get bits from bytes
-        signal = np.unpackbits(signal_bytes, axis=-1, count=None,
-                               bitorder='little')
-        # Convert snapshots from {0,1} to {-1,+1}
-        signal = -2 * signal.astype(np.int8) + 1
+        try:
+            mtime_ns = os.stat(filename).st_mtime_ns
+        except OSError:
+            print(f"Cannot read snapshot from {filename}.")
+            return None
+        # Memory-map pre-decoded samples instead of decoding again
+        signal = self._load_cached_snapshot(filename, mtime_ns)
+        if signal is None:
+            # Map binary raw data from file without copying it
+            signal_bytes = self._map_snapshot_file(filename)
+            if signal_bytes is None:
+                return None
+            if (normalize and not self._cache_writable
+                    and _decode_normalized is not None):
+                # No int8 snapshot needed for cache, hence, decode and remove
+                # mean in a single pass
+                out = np.empty(self._SAMPLES_PER_SNAPSHOT, dtype=np.float32)
+                _decode_normalized(signal_bytes, out)
+                return out
+            # Decode to int8, which the cache stores, and normalize below
+            if _decode is not None:
+                # Get samples in {-1,+1} from bytes with compiled kernel
+                signal = np.empty(self._SAMPLES_PER_SNAPSHOT, dtype=np.int8)
+                _decode(np.ascontiguousarray(signal_bytes, dtype=np.uint8),
+                        signal)
+            else:
+                # Get bits from bytes
+                signal = np.unpackbits(signal_bytes, bitorder='little')
+                # Convert snapshot in-place from {0,1} to {-1,+1}
+                signal = signal.view(np.int8)
+                signal *= -2
+                signal += 1
+            # Store decoded snapshot for next access
+            self._cache_snapshot(filename, mtime_ns, signal)
+            # Behave like memory-mapped cache
+            signal.flags.writeable = False
         # Check if signal shall be normalized
         if normalize:
-            signal = signal.astype(np.float32)
-            return signal - np.mean(signal)
+            # Cast to float32 and subtract mean in a single pass
+            out = np.empty(signal.shape, dtype=np.float32)
+            np.subtract(signal, signal.mean(dtype=np.float32), out=out,
+                        casting='unsafe')
+            return out
         return signal
 
+    def _map_snapshot_file(self, filename):
+        """
+        Memory-map binary raw data of snapshot.
+
+        Parameters
+        ----------
+        filename : string
+            Path of binary raw data file.
+
+        Returns
+        -------
+        numpy.memmap, dtype=uint8, shape=(6138,)
+            Read-only binary raw data, None if file cannot be read or is
+            shorter than 12 ms.
+
+        """
+        try:
+            return np.memmap(filename, dtype=np.uint8, mode='r',
+                             shape=(self._BYTES_PER_SNAPSHOT,))
+        except ValueError:
+            print(f"Snapshot in {filename} is too short.")
+        except OSError:
+            print(f"Cannot read snapshot from {filename}.")
+        return None
+
+    def _load_cached_snapshot(self, filename, mtime_ns):
+        """
+        Load decoded snapshot from cache if it is up to date.
+
+        Parameters
+        ----------
+        filename : string
+            Path of binary raw data file.
+        mtime_ns : int
+            Modification time [ns] of binary raw data file.
+
+        Returns
+        -------
+        numpy.memmap, dtype=int8, shape=(49104,)
+            Memory-mapped read-only snapshot, None if there is no valid cache.
+
+        """
+        if not self._cache:
+            return None
+        cache_file = os.path.join(self._cache_directory,
+                                  os.path.basename(filename) + ".npy")
+        try:
+            # Cache carries modification time of file it was created from
+            if os.stat(cache_file).st_mtime_ns == mtime_ns:
+                signal = np.load(cache_file, mmap_mode='r')
+                if signal.shape == (self._SAMPLES_PER_SNAPSHOT,):
+                    return signal
+        except (ValueError, OSError, EOFError):
+            pass
+        return None
+
+    def _cache_snapshot(self, filename, mtime_ns, signal):
+        """
+        Store decoded snapshot in cache.
+
+        Parameters
+        ----------
+        filename : string
+            Path of binary raw data file.
+        mtime_ns : int
+            Modification time [ns] of binary raw data file when it was read.
+        signal : numpy.ndarray, dtype=int8, shape=(49104,)
+            Decoded snapshot.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self._cache_writable:
+            return
+        cache_file = os.path.join(self._cache_directory,
+                                  os.path.basename(filename) + ".npy")
+        try:
+            _save_atomically(cache_file, mtime_ns, np.save, signal)
+        except OSError:
+            print(f"Cannot write decoded snapshot to {cache_file}.")
+            print("Do not cache decoded snapshots of this dataset.")
+            self._cache_writable = False
+
+    def get_snapshots(self, indices, normalize=False):
+        """
+        Get multiple raw GNSS signal snapshots at once.
+
+        Parameters
+        ----------
+        indices : array_like of int, shape=(K,)
+            Indices of files / snapshots.
+        normalize : bool, optional
+            Subtract mean from each signal. The default is False.
+
+        Returns
+        -------
+        np.ndarray, dtype=int8 if normalize=False, dtype=float32 if
+        normalize=True, shape=(K, 49104)
+            Binary raw GNSS snapshots with length 12 ms sampled at 4.092 MHz,
+            one per row, as returned by get_snapshot. Snapshots that
+            get_snapshot has cached are read from the .npy files, all others
+            are decoded in parallel if numba is installed, but not cached.
+            None if a snapshot file cannot be read or is shorter than 12 ms.
+
+        """
+        try:
+            filenames = [os.path.join(self._directory, self._filenames[idx])
+                         for idx in indices]
+        except IndexError:
+            print(f"Snapshot indices {indices} out of range "
+                  f"{0}-{self.get_size()-1}.")
+            return None
+        signals = np.empty((len(filenames), self._SAMPLES_PER_SNAPSHOT),
+                           dtype=np.int8)
+        # Copy cached snapshots and remember the others
+        uncached_rows = []
+        for row, filename in enumerate(filenames):
+            try:
+                mtime_ns = os.stat(filename).st_mtime_ns
+            except OSError:
+                print(f"Cannot read snapshot from {filename}.")
+                return None
+            cached = self._load_cached_snapshot(filename, mtime_ns)
+            if cached is not None:
+                signals[row] = cached
+            else:
+                uncached_rows.append(row)
+        # Read binary raw data of other snapshots into one contiguous array
+        signal_bytes = np.empty((len(uncached_rows),
+                                 self._BYTES_PER_SNAPSHOT), dtype=np.uint8)
+        for byte_row, row in zip(signal_bytes, uncached_rows):
+            file_bytes = self._map_snapshot_file(filenames[row])
+            if file_bytes is None:
+                return None
+            byte_row[:] = file_bytes
+        if _decode_batch is not None:
+            # Decode snapshots in parallel with compiled kernel
+            decoded = np.empty((len(uncached_rows),
+                                self._SAMPLES_PER_SNAPSHOT), dtype=np.int8)
+            _decode_batch(signal_bytes, decoded)
+        else:
+            # Get bits from bytes
+            decoded = np.unpackbits(signal_bytes, axis=1, bitorder='little')
+            # Convert snapshots in-place from {0,1} to {-1,+1}
+            decoded = decoded.view(np.int8)
+            decoded *= -2
+            decoded += 1
+        signals[uncached_rows] = decoded
+        if normalize:
+            # Cast to float32 and subtract means in a single pass
+            out = np.empty(signals.shape, dtype=np.float32)
+            np.subtract(signals, signals.mean(axis=1, dtype=np.float32,
+                                              keepdims=True),
+                        out=out, casting='unsafe')
+            return out
+        return signals
+
     def get_ground_truth(self):
         """
         Get ground truth location or track.
@@ -224,8 +751,31 @@ class Dataset:
             which nodes are not directly related to snapshots.
 
         """
+        if self._ground_truth_latlon is not None:
+            # Build list of dictionaries for track on demand
+            lat_arr, lon_arr = self._ground_truth_latlon
+            return [{"latitude": lat, "longitude": lon}
+                    for lat, lon in zip(lat_arr.tolist(), lon_arr.tolist())]
         return self._ground_truth
 
+    def get_ground_truth_arrays(self):
+        """
+        Get ground truth location or track as arrays.
+
+        Returns
+        -------
+        tuple (numpy.ndarray, numpy.ndarray), dtype=float64, shape=(M,)
+            Latitudes [°] and longitudes [°] of ground truth track nodes or
+            of static ground truth location (M=1). None if no ground truth.
+
+        """
+        if self._ground_truth_latlon is not None:
+            return self._ground_truth_latlon
+        if self._ground_truth is not None:
+            return (np.array([self._ground_truth["latitude"]], dtype=float),
+                    np.array([self._ground_truth["longitude"]], dtype=float))
+        return None
+
     def get_intermediate_frequency(self):
         """
         Get intermediate frequency.
@@ -292,37 +842,26 @@ class Dataset:
             ground truth location / or next location on ground truth track.
 
         """
-        try:
-            import pymap3d as pm
-        except ImportError:
-            print("Miss package that is required to calculate error.")
-            print("Install pymap3d.")
-            return
+        # Failed position estimates are often marked by inf or NaN
+        if not (math.isfinite(latitude) and math.isfinite(longitude)):
+            return np.inf
         # Calculate positioning error in ENU coordinates [m,m,m]
         err_east, err_north, err_height \
-            = pm.geodetic2enu(latitude, longitude, 0,
-                              self._ref_location["latitude"],
-                              self._ref_location["longitude"], 0)
-
-        if self._track is not None:
-            try:
-                import shapely.geometry as sg
-            except ImportError:
-                print("Miss package that is required to calculate error.")
-                print("Install Shapely.")
-                return
-            pos_enu = np.array([err_east, err_north, err_height])
-            # Get nearest point on line for all estimated points
-            nearest_point = self._track.interpolate(self._track.project(
-                sg.Point((pos_enu[0], pos_enu[1]))
-                ))
-
-            # Calculate horizontal error
-            err = np.linalg.norm(nearest_point.coords[0] - pos_enu[:2])
+            = self._ecef2enu @ (_geodetic2ecef(latitude, longitude)
+                                - self._ref_ecef)
+
+        if self._seg_a is not None:
+            pos_enu = np.array([err_east, err_north])
+            # Project point onto all segments of track at once
+            t = np.clip(((pos_enu - self._seg_a) * self._seg_d).sum(1)
+                        / self._seg_len2, 0.0, 1.0)
+            proj = self._seg_a + t[:, None] * self._seg_d
+            # Calculate horizontal error w.r.t. nearest point on track
+            err = math.sqrt(((proj - pos_enu)**2).sum(1).min())
         else:
-            err = np.linalg.norm(np.array([err_east, err_north]))
+            err = math.hypot(err_east, err_north)
 
-        if np.isnan(err):
+        if math.isnan(err):
             return np.inf
         else:
             return err